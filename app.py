@@ -1,6 +1,18 @@
 import streamlit as st
 
-from company_extractor import process_csv_text
+from company_extractor import iter_processed_rows, read_rows_from_text, rows_to_csv_bytes
+
+
+def track_progress(results, total):
+    progress = st.progress(0.0)
+    status = st.empty()
+    step = max(1, total // 100)
+    for i, row in enumerate(results, start=1):
+        yield row
+        if i % step == 0 or i == total:
+            progress.progress(i / total)
+            status.text(f"Processed {i}/{total} rows")
+
 
 st.set_page_config(page_title="Turnover Extractor", layout="centered")
 st.title("CSV Turnover Extractor")
@@ -16,16 +28,16 @@ if uploaded is not None:
         st.stop()
 
     if st.button("Process CSV", type="primary"):
-        with st.spinner("Processing..."):
-            output_text = process_csv_text(input_text)
+        rows = read_rows_from_text(input_text)
+        output_bytes = rows_to_csv_bytes(track_progress(iter_processed_rows(rows), len(rows)))
 
         st.success("Processing complete")
         st.download_button(
             "Download Output CSV",
-            data=output_text.encode("utf-8"),
+            data=output_bytes,
             file_name="output_extracted.csv",
             mime="text/csv",
         )
 
         st.subheader("Preview")
-        st.code("\n".join(output_text.splitlines()[:12]), language="csv")
+        st.code(b"\n".join(output_bytes.splitlines()[:12]).decode("utf-8"), language="csv")
@@ -1,36 +1,77 @@
 #!/usr/bin/env python3
 """Core processing module for company turnover/category extraction."""
 
+import codecs
 import csv
 import io
+import itertools
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from html import unescape
 from urllib.parse import parse_qs, quote_plus, unquote, urlparse
 
+import ahocorasick
 import requests
-from bs4 import BeautifulSoup
+from lxml import etree
 from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+from selectolax.lexbor import LexborHTMLParser
 from urllib3.util.retry import Retry
 
+try:
+    import re2
+except ImportError:  # google-re2 is optional; _compile_text_re keeps both engines in step.
+    re2 = re
+
 # Optional script mode paths.
 INPUT_CSV_PATH = "/home/window/hardproject/TO & Micro Categories.csv"
 OUTPUT_CSV_PATH = "/home/window/hardproject/output_extracted.csv"
 
 WORKERS = 6
+IO_WORKERS = 12
 MAX_RESULTS = 5
 TIMEOUT = 12
 PAGE_CHAR_LIMIT = 120_000
+PAGE_CHUNK_SIZE = 64 * 1024
 SEARCH_AVAILABLE = None
+QUERY_CACHE_TTL = 3600
+QUERY_CACHE_SIZE = 4096
+PAGE_CACHE_TTL = 3600
+PAGE_CACHE_SIZE = 256
+RESULT_CACHE_SIZE = 4096
 
 # Fast mode avoids network calls and relies on CSV + local heuristics.
 FAST_MODE = True
 DEEP_FETCH = False
 
 HEADERS = {
-    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121 Safari/537.36"
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121 Safari/537.36",
+    "Connection": "keep-alive",
 }
 
+# Extracted fields by normalised (name, city, turnover_raw, mode) key.
+RESULT_CACHE = {}
+RESULT_CACHE_LOCK = threading.Lock()
+
+# DDG results by query string, shared by every row and run in this process.
+QUERY_CACHE = {}
+QUERY_IN_FLIGHT = {}
+QUERY_CACHE_LOCK = threading.Lock()
+
+# Extracted page text by URL; pages are up to PAGE_CHAR_LIMIT chars, so keep fewer.
+PAGE_CACHE = {}
+PAGE_IN_FLIGHT = {}
+PAGE_CACHE_LOCK = threading.Lock()
+
+# Shared across calls so Streamlit reruns don't respawn worker threads.
+EXECUTOR = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="extractor")
+# Row workers wait on searches and page fetches here; kept separate from EXECUTOR
+# so a row never waits on work queued behind itself, and capped so all rows
+# together send at most IO_WORKERS requests at a time.
+IO_EXECUTOR = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="extractor-io")
+
 SESSION = requests.Session()
 SESSION.headers.update(HEADERS)
 RETRY = Retry(
@@ -41,10 +82,17 @@ RETRY = Retry(
     status_forcelist=(429, 500, 502, 503, 504),
     allowed_methods=("GET",),
 )
-ADAPTER = HTTPAdapter(max_retries=RETRY, pool_connections=20, pool_maxsize=20)
+# Block on a free pooled socket rather than opening throwaway connections past
+# pool_maxsize when many IO_EXECUTOR threads hit the same host.
+ADAPTER = HTTPAdapter(max_retries=RETRY, pool_connections=32, pool_maxsize=64, pool_block=True)
 SESSION.mount("http://", ADAPTER)
 SESSION.mount("https://", ADAPTER)
 
+# Accepted input headers, in order of preference.
+NAME_COLUMNS = ("company_name", "name")
+CITY_COLUMNS = ("city",)
+TURNOVER_COLUMNS = ("turnover", "revenue", "annual_turnover", "turnover_in_cr")
+
 NAME_MAP = [
     (("paint", "coating"), ("Manufacturing", "Consumer Goods", "paint products")),
     (("chemical",), ("Manufacturing", "Industrial", "industrial chemicals")),
@@ -67,7 +115,41 @@ ESTIMATE_BY_KEYWORD = [
     (("store",), 5.0),
 ]
 
+
+def _keyword_automaton(table):
+    automaton = ahocorasick.Automaton()
+    for i, (keys, value) in enumerate(table):
+        for k in keys:
+            if k not in automaton:
+                automaton.add_word(k, (i, value))
+    automaton.make_automaton()
+    return automaton
+
+
+def _first_keyword_value(automaton, hay, default):
+    # Matches come back in text order; the earliest table entry still wins.
+    best = None
+    for _, (i, value) in automaton.iter(hay):
+        if best is None or i < best[0]:
+            best = (i, value)
+            if i == 0:
+                break
+    return best[1] if best else default
+
+
+NAME_AUTOMATON = _keyword_automaton(NAME_MAP)
+ESTIMATE_AUTOMATON = _keyword_automaton(ESTIMATE_BY_KEYWORD)
+
 FX = {"USD": 83.0, "EUR": 90.0, "GBP": 105.0, "INR": 1.0}
+# Currency tokens as MONEY_RE captures them (lowercased); anything else is INR.
+CURRENCY_RATE = {
+    "$": FX["USD"],
+    "usd": FX["USD"],
+    "€": FX["EUR"],
+    "eur": FX["EUR"],
+    "£": FX["GBP"],
+    "gbp": FX["GBP"],
+}
 UNIT = {
     "cr": 10_000_000,
     "crore": 10_000_000,
@@ -80,36 +162,70 @@ UNIT = {
     "bn": 1_000_000_000,
 }
 
-MONEY_RE = re.compile(
-    r"(?P<cur1>₹|\$|€|£|inr|usd|eur|gbp|rs\.?)?\s*"
+
+def _compile_text_re(pattern):
+    # RE2's \d, \s and \b are ASCII-only while re's are Unicode, and page text is
+    # full of "5\xa0Cr" and non-ASCII digits. Spell out re's classes for RE2. The
+    # \b rewrite consumes the neighbouring character, so only use \b( ... )\b in
+    # patterns that are searched for a yes/no answer.
+    if re2 is re:
+        return re.compile(pattern)
+    pattern = pattern.replace(r"\d", r"\p{Nd}").replace(r"\s", r"[\t-\r\x1c-\x1f\x85\pZ]")
+    pattern = pattern.replace(r"\b(", r"(?:^|[^\pL\pN_])(").replace(r")\b", r")(?:$|[^\pL\pN_])")
+    return re2.compile(pattern)
+
+
+MONEY_RE = _compile_text_re(
+    r"(?i)(?P<cur1>₹|\$|€|£|inr|usd|eur|gbp|rs\.?)?\s*"
     r"(?P<num>\d[\d,]*(?:\.\d+)?)\s*"
     r"(?P<unit>cr|crore|crores|lakh|lakhs|million|m|mn|billion|bn)?\s*"
-    r"(?P<cur2>inr|usd|eur|gbp)?",
-    re.IGNORECASE,
+    r"(?P<cur2>inr|usd|eur|gbp)?"
+)
+DIGIT_RE = _compile_text_re(r"\d")
+CONTEXT_RE = _compile_text_re(
+    r"\b(turnover|revenue|sales|income|annual report|financial statement|fy\d{2,4}|fy\s\d{2,4})\b"
 )
+# Plain substrings covering every CONTEXT_RE alternative, for a cheap pre-check.
+CONTEXT_WORDS = ("turnover", "revenue", "sales", "income", "annual report", "financial statement", "fy")
+STRONG_CONTEXT_RE = _compile_text_re(r"\b(turnover|revenue|annual turnover)\b")
+RANGE_RE = _compile_text_re(
+    r"(?i)(\d[\d,]*(?:\.\d+)?)\s*(cr|crore|crores|lakh|lakhs|million|m|mn|billion|bn)\s*"
+    r"(?:to|-)\s*"
+    r"(\d[\d,]*(?:\.\d+)?)\s*(cr|crore|crores|lakh|lakhs|million|m|mn|billion|bn)"
+)
+SKIP_TAGS = {"script", "style", "noscript", "svg"}
 
 
 def read_rows(path):
     with open(path, newline="", encoding="utf-8-sig") as f:
-        return read_rows_from_reader(csv.DictReader(f))
+        return read_rows_from_reader(csv.reader(f))
 
 
 def read_rows_from_text(csv_text):
-    return read_rows_from_reader(csv.DictReader(io.StringIO(csv_text)))
+    return read_rows_from_reader(csv.reader(io.StringIO(csv_text)))
+
+
+def _first_value(record, indexes):
+    for i in indexes:
+        if i < len(record) and record[i]:
+            return record[i]
+    return ""
 
 
 def read_rows_from_reader(reader):
+    # Resolve header positions once instead of building a dict per record.
+    header = next(reader, None)
+    if header is None:
+        return []
+    index = {col: i for i, col in enumerate(header)}
+    name_idx = [index[c] for c in NAME_COLUMNS if c in index]
+    city_idx = [index[c] for c in CITY_COLUMNS if c in index]
+    turnover_idx = [index[c] for c in TURNOVER_COLUMNS if c in index]
     rows = []
-    for row in reader:
-        name = (row.get("company_name") or row.get("name") or "").strip()
-        city = (row.get("city") or "").strip()
-        turnover_raw = (
-            row.get("turnover")
-            or row.get("revenue")
-            or row.get("annual_turnover")
-            or row.get("turnover_in_cr")
-            or ""
-        ).strip()
+    for record in reader:
+        name = _first_value(record, name_idx).strip()
+        city = _first_value(record, city_idx).strip()
+        turnover_raw = _first_value(record, turnover_idx).strip()
         if name and city:
             rows.append({"name": name, "city": city, "turnover_raw": turnover_raw})
     return rows
@@ -123,19 +239,67 @@ def _clean_ddg_url(url):
     return unquote(real) if real else url
 
 
+def _store_cached(cache, size, ttl, key, value):
+    # Caller holds the cache's lock. Entries stay in insertion (= age) order.
+    now = time.monotonic()
+    cache.pop(key, None)
+    if len(cache) >= size:
+        for k in [k for k, (ts, _) in cache.items() if now - ts >= ttl]:
+            del cache[k]
+    while len(cache) >= size:
+        del cache[next(iter(cache))]
+    cache[key] = (now, value)
+
+
+def _shared_fetch(cache, in_flight, lock, size, ttl, key, fetch, keep):
+    # The first caller for a key fetches it; concurrent callers for the same
+    # key wait on its Future instead of sending a duplicate request.
+    with lock:
+        hit = cache.get(key)
+        if hit and time.monotonic() - hit[0] < ttl:
+            return hit[1]
+        pending = in_flight.get(key)
+        owner = pending is None
+        if owner:
+            pending = in_flight[key] = Future()
+    if not owner:
+        return pending.result()
+    try:
+        out = fetch(key)
+    except BaseException as exc:
+        with lock:
+            del in_flight[key]
+        pending.set_exception(exc)
+        raise
+    with lock:
+        del in_flight[key]
+        if keep(out):
+            _store_cached(cache, size, ttl, key, out)
+    pending.set_result(out)
+    return out
+
+
 def ddg_results(query):
+    # An empty list is often DDG's throttle page (HTTP 202); don't pin it.
+    return _shared_fetch(
+        QUERY_CACHE, QUERY_IN_FLIGHT, QUERY_CACHE_LOCK, QUERY_CACHE_SIZE, QUERY_CACHE_TTL,
+        query, _fetch_ddg_results, bool,
+    )
+
+
+def _fetch_ddg_results(query):
     url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
     r = SESSION.get(url, timeout=TIMEOUT)
     r.raise_for_status()
-    soup = BeautifulSoup(r.text, "html.parser")
+    tree = LexborHTMLParser(r.content)
     out = []
-    for item in soup.select(".result")[:MAX_RESULTS]:
-        a = item.select_one(".result__a")
-        snip = item.select_one(".result__snippet")
-        href = _clean_ddg_url((a.get("href") if a else "") or "")
-        title = a.get_text(" ", strip=True) if a else ""
+    for item in tree.css(".result")[:MAX_RESULTS]:
+        a = item.css_first(".result__a")
+        snip = item.css_first(".result__snippet")
+        href = _clean_ddg_url((a.attributes.get("href") if a else "") or "")
+        title = a.text(separator=" ", strip=True) if a else ""
         if href:
-            out.append((href, title, snip.get_text(" ", strip=True) if snip else ""))
+            out.append((href, title, snip.text(separator=" ", strip=True) if snip else ""))
     return out
 
 
@@ -151,80 +315,132 @@ def search_up():
     return SEARCH_AVAILABLE
 
 
-def fetch_page_text(url):
-    r = SESSION.get(url, timeout=TIMEOUT)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "html.parser")
-    for bad in soup(["script", "style", "noscript", "svg"]):
-        bad.extract()
-    return unescape(soup.get_text(" ", strip=True))[:PAGE_CHAR_LIMIT]
-
-
-def infer_category(company, text):
-    hay = (company + " " + text).lower()
-    for keys, mapped in NAME_MAP:
-        if any(k in hay for k in keys):
-            return mapped
-    return "", "", ""
+def _drain_page_events(parser, stack):
+    # Each open element collects the joined text of its finished children. On
+    # "end" the element's own text and its children's tails are complete, so
+    # it can be folded into its parent and its subtree dropped.
+    size = 0
+    for event, el in parser.read_events():
+        if event == "start":
+            stack.append([])
+            continue
+        parts = iter(stack.pop())
+        if el.tag in SKIP_TAGS:
+            del el[:]
+            stack[-1].append("")
+            continue
+        pieces = [el.text]
+        for child in el:
+            if isinstance(child.tag, str):
+                pieces.append(next(parts, ""))
+            pieces.append(child.tail)
+        text = " ".join(p.strip() for p in pieces if p and p.strip())
+        size += len(el.text or "") + sum(len(child.tail or "") for child in el)
+        del el[:]
+        stack[-1].append(text)
+    return size
+
+
+def _page_decoder(r, head):
+    # requests falls back to ISO-8859-1 for text/* without a charset; only trust
+    # r.encoding when the server actually sent one. Otherwise let libxml2 read a
+    # <meta charset>, and guess from the first chunk only when there is neither.
+    # Decoding happens in Python so any codec name chardet returns is usable.
+    if "charset=" in r.headers.get("content-type", "").lower():
+        encoding = r.encoding
+    elif b"charset" in head[:2048].lower():
+        return None
+    else:
+        encoding = chardet.detect(head)["encoding"]
+    try:
+        if encoding and codecs.lookup(encoding).name == "ascii":
+            # An all-ASCII head (long inline CSS/JS) says nothing about the rest;
+            # UTF-8 is a superset and the common case for undeclared pages.
+            encoding = "utf-8"
+        return codecs.getincrementaldecoder(encoding)(errors="replace").decode if encoding else None
+    except LookupError:
+        return None
 
 
-def estimate_turnover_in_cr(company_name):
-    c = company_name.lower()
-    for keys, value in ESTIMATE_BY_KEYWORD:
-        if any(k in c for k in keys):
-            return f"{value:.2f} Cr"
-    return "10.00 Cr"
+def fetch_page_text(url):
+    with SESSION.get(url, timeout=TIMEOUT, stream=True) as r:
+        r.raise_for_status()
+        chunks = r.iter_content(PAGE_CHUNK_SIZE)
+        head = next(chunks, b"")
+        decode = _page_decoder(r, head)
+        parser = etree.HTMLPullParser(events=("start", "end"), huge_tree=True)
+        stack = [[]]
+        size = 0
+        for chunk in itertools.chain((head,), chunks):
+            parser.feed(decode(chunk) if decode else chunk)
+            size += _drain_page_events(parser, stack)
+            if size >= PAGE_CHAR_LIMIT:
+                break
+        if decode:
+            parser.feed(decode(b"", final=True))
+    parser.close()
+    _drain_page_events(parser, stack)
+    # A cut-short or aborted parse leaves elements open; keep what they collected.
+    return " ".join(t for level in stack for t in level if t)[:PAGE_CHAR_LIMIT]
+
+
+def infer_category(company, text, text_low=None):
+    if text_low is None:
+        text_low = text.lower()
+    hay = company.lower() + " " + text_low
+    return _first_keyword_value(NAME_AUTOMATON, hay, ("", "", ""))
+
+
+def estimate_turnover_in_cr(company_name, name_low=None):
+    if name_low is None:
+        name_low = company_name.lower()
+    value = _first_keyword_value(ESTIMATE_AUTOMATON, name_low, 10.0)
+    return f"{value:.2f} Cr"
 
 
 def to_inr_cr(amount, unit, currency):
     mul = UNIT.get((unit or "").lower(), 1.0)
-    cur = (currency or "INR").lower().replace("rs.", "inr").replace("rs", "inr")
-    if cur in ("$", "usd"):
-        rate = FX["USD"]
-    elif cur in ("€", "eur"):
-        rate = FX["EUR"]
-    elif cur in ("£", "gbp"):
-        rate = FX["GBP"]
-    else:
-        rate = FX["INR"]
+    rate = CURRENCY_RATE.get((currency or "").lower(), FX["INR"])
     return f"{(amount * mul * rate) / 10_000_000:.2f} Cr"
 
 
-def extract_turnover_in_cr(text):
-    t = unescape(text)
-    t_low = t.lower()
-    best = ""
+def extract_turnover_in_cr(text, text_low=None):
+    if not DIGIT_RE.search(text):
+        return ""
+    t_low = text_low if text_low is not None else text.lower()
+    if not any(w in t_low for w in CONTEXT_WORDS):
+        return ""
+    # Score first and convert only the winner: most matches never beat the
+    # current best, so they skip float parsing and formatting entirely.
+    best = None
     best_score = -1.0
-    for m in MONEY_RE.finditer(t):
-        start = max(0, m.start() - 80)
-        end = min(len(t_low), m.end() + 80)
-        win = t_low[start:end]
-        if not re.search(r"\b(turnover|revenue|sales|income|annual report|financial statement|fy\d{2,4}|fy\s\d{2,4})\b", win):
+    n = len(t_low)
+    for m in MONEY_RE.finditer(text):
+        start = m.start() - 80
+        win = t_low[start if start > 0 else 0 : min(n, m.end() + 80)]
+        cur1, num, unit, cur2 = m.groups()
+        cur = cur1 or cur2
+        score = 1.0 + (1.0 if unit else 0.0) + (0.5 if cur else 0.0)
+        if score + 1.0 <= best_score or not CONTEXT_RE.search(win):
             continue
-        num = float(m.group("num").replace(",", ""))
-        unit = m.group("unit")
-        cur = m.group("cur1") or m.group("cur2")
-        if not unit and not cur and num < 1_000_000:
+        if not unit and not cur and float(num.replace(",", "")) < 1_000_000:
             continue
-        val = to_inr_cr(num, unit, cur)
-        score = 1.0 + (1.0 if unit else 0.0) + (0.5 if cur else 0.0)
-        if re.search(r"\b(turnover|revenue|annual turnover)\b", win):
+        if STRONG_CONTEXT_RE.search(win):
             score += 1.0
         if score > best_score:
             best_score = score
-            best = val
-    return best
-
-
-def extract_range_turnover_in_cr(text):
-    t = unescape(text).lower()
-    m = re.search(
-        r"(\d[\d,]*(?:\.\d+)?)\s*(cr|crore|crores|lakh|lakhs|million|m|mn|billion|bn)\s*"
-        r"(?:to|-)\s*"
-        r"(\d[\d,]*(?:\.\d+)?)\s*(cr|crore|crores|lakh|lakhs|million|m|mn|billion|bn)",
-        t,
-        re.IGNORECASE,
-    )
+            best = (num, unit, cur)
+    if best is None:
+        return ""
+    num, unit, cur = best
+    return to_inr_cr(float(num.replace(",", "")), unit, cur)
+
+
+def extract_range_turnover_in_cr(text, text_low=None):
+    if not DIGIT_RE.search(text):
+        return ""
+    t = text_low if text_low is not None else text.lower()
+    m = RANGE_RE.search(t)
     if not m:
         return ""
     low = float(to_inr_cr(float(m.group(1).replace(",", "")), m.group(2), "INR").split()[0])
@@ -232,9 +448,34 @@ def extract_range_turnover_in_cr(text):
     return f"{(low + high) / 2:.2f} Cr"
 
 
-def process_one(name, city, turnover_raw):
+def _try_ddg_results(query):
+    try:
+        return ddg_results(query)
+    except Exception:
+        return []
+
+
+def cached_page_text(url):
+    # Result pages repeat across rows for the same company; failures raise and
+    # so are never cached.
+    return _shared_fetch(
+        PAGE_CACHE, PAGE_IN_FLIGHT, PAGE_CACHE_LOCK, PAGE_CACHE_SIZE, PAGE_CACHE_TTL,
+        url, fetch_page_text, lambda text: True,
+    )
+
+
+def _try_fetch_page_text(url):
+    try:
+        return cached_page_text(url)
+    except Exception:
+        return None
+
+
+def _extract_fields(name, city, turnover_raw, fast_mode, deep_fetch):
+    # Returns the extracted fields and whether they may be reused for later rows.
     texts = []
-    if not FAST_MODE and search_up():
+    reusable = True
+    if not fast_mode and search_up():
         queries = [
             f'"{name}" "{city}" turnover revenue',
             f'"{name}" "{city}" annual sales',
@@ -243,12 +484,16 @@ def process_one(name, city, turnover_raw):
             f'"{name}" "{city}" balance sheet revenue',
             f'"{name}" "{city}" company profile',
         ]
+        batches = list(IO_EXECUTOR.map(_try_ddg_results, queries))
+        # With no search results at all (timeouts, throttling) the row falls back
+        # to the keyword estimate; don't pin that for the life of the process.
+        reusable = any(batches)
+        pages = {}
+        if deep_fetch:
+            urls = list(dict.fromkeys(url for results in batches for url, _, _ in results if url))
+            pages = dict(zip(urls, IO_EXECUTOR.map(_try_fetch_page_text, urls)))
         seen = set()
-        for q in queries:
-            try:
-                results = ddg_results(q)
-            except Exception:
-                continue
+        for results in batches:
             for url, title, snippet in results:
                 if snippet:
                     texts.append(snippet)
@@ -257,19 +502,44 @@ def process_one(name, city, turnover_raw):
                 if not url or url in seen:
                     continue
                 seen.add(url)
-                if DEEP_FETCH:
-                    try:
-                        texts.append(fetch_page_text(url))
-                    except Exception:
-                        pass
+                if pages.get(url) is not None:
+                    texts.append(pages[url])
 
     text = " ".join(texts)
-    turnover = extract_turnover_in_cr(text) or extract_range_turnover_in_cr(text)
+    text_low = text.lower()
+    turnover = extract_turnover_in_cr(text, text_low) or extract_range_turnover_in_cr(text, text_low)
     if not turnover and turnover_raw:
-        turnover = extract_turnover_in_cr(turnover_raw) or extract_range_turnover_in_cr(turnover_raw)
+        # CSV cells never pass through an HTML parser, so decode entities here.
+        turnover_raw = unescape(turnover_raw)
+        raw_low = turnover_raw.lower()
+        turnover = extract_turnover_in_cr(turnover_raw, raw_low) or extract_range_turnover_in_cr(
+            turnover_raw, raw_low
+        )
     if not turnover:
-        turnover = estimate_turnover_in_cr(name)
-    cat, sub, micro = infer_category(name, text)
+        # name arrives already lowercased from process_one.
+        turnover = estimate_turnover_in_cr(name, name_low=name)
+    cat, sub, micro = infer_category(name, text, text_low=text_low)
+    return (turnover, cat, sub, micro), reusable
+
+
+def process_one(name, city, turnover_raw):
+    # Duplicate company/city rows are common; only the extracted fields are cached.
+    key = (name.strip().lower(), city.strip().lower(), turnover_raw.strip(), FAST_MODE, DEEP_FETCH)
+    # RESULT_CACHE is kept in least- to most-recently-used order: hits move to
+    # the end, and eviction takes from the front.
+    with RESULT_CACHE_LOCK:
+        fields = RESULT_CACHE.pop(key, None)
+        if fields is not None:
+            RESULT_CACHE[key] = fields
+    if fields is None:
+        fields, reusable = _extract_fields(*key)
+        if reusable:
+            with RESULT_CACHE_LOCK:
+                RESULT_CACHE.pop(key, None)
+                if len(RESULT_CACHE) >= RESULT_CACHE_SIZE:
+                    RESULT_CACHE.pop(next(iter(RESULT_CACHE)))
+                RESULT_CACHE[key] = fields
+    turnover, cat, sub, micro = fields
     return {
         "company_name": name,
         "city": city,
@@ -280,38 +550,43 @@ def process_one(name, city, turnover_raw):
     }
 
 
+def iter_processed_rows(rows):
+    # Yields output rows in input order as they finish, so callers can report
+    # progress and write CSV without holding the whole result list.
+    names = [row["name"] for row in rows]
+    cities = [row["city"] for row in rows]
+    turnovers = [row["turnover_raw"] for row in rows]
+    if FAST_MODE:
+        # FAST_MODE rows are pure CPU work under the GIL; threads only add handoff cost.
+        return map(process_one, names, cities, turnovers)
+    return EXECUTOR.map(process_one, names, cities, turnovers)
+
+
 def process_rows(rows):
-    out = [None] * len(rows)
-    with ThreadPoolExecutor(max_workers=WORKERS) as ex:
-        futures = {
-            ex.submit(process_one, row["name"], row["city"], row["turnover_raw"]): i
-            for i, row in enumerate(rows)
-        }
-        for fut in as_completed(futures):
-            out[futures[fut]] = fut.result()
-    return out
+    return list(iter_processed_rows(rows))
 
 
-def rows_to_csv_text(rows):
+def rows_to_csv_bytes(rows):
     cols = ["company_name", "city", "turnover_in_cr", "category", "sub_category", "micro_category"]
-    s = io.StringIO()
+    buf = io.BytesIO()
+    s = io.TextIOWrapper(buf, encoding="utf-8", newline="", write_through=True)
     w = csv.DictWriter(s, fieldnames=cols)
     w.writeheader()
     w.writerows(rows)
-    return s.getvalue()
+    s.detach()
+    return buf.getvalue()
 
 
 def process_csv_text(csv_text):
+    # Takes the input CSV as text; returns the output CSV as UTF-8 bytes.
     rows = read_rows_from_text(csv_text)
-    out = process_rows(rows)
-    return rows_to_csv_text(out)
+    return rows_to_csv_bytes(iter_processed_rows(rows))
 
 
 def process_csv_file(input_path, output_path):
     rows = read_rows(input_path)
-    out = process_rows(rows)
-    with open(output_path, "w", newline="", encoding="utf-8") as f:
-        f.write(rows_to_csv_text(out))
+    with open(output_path, "wb") as f:
+        f.write(rows_to_csv_bytes(iter_processed_rows(rows)))
 
 
 def main():